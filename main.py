@@ -1,13 +1,35 @@
+import collections
+import contextlib
+import io
 import json
+import mmap
 import os
+import queue
 import shutil
+import struct
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import click
 import pymysql
-import yaml
 
-LONG_COLUMN = ['text', 'mediumtext', 'longtext']
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LONG_COLUMN = frozenset(['tinytext', 'text', 'mediumtext', 'longtext',
+                         'tinyblob', 'blob', 'mediumblob', 'longblob'])
+
+INTEGER_COLUMN = frozenset(['tinyint', 'smallint', 'mediumint', 'int',
+                            'bigint'])
 
 VERBOSE_NONE = 0
 
@@ -15,29 +37,123 @@ VERBOSE_IMPORTANT = 1
 
 VERBOSE_EVERYTHING = 2
 
+# number of rows between progress messages of verbose level 1
+PROGRESS_ROWS = 10000
+
+# number of tables dumped or recovered in parallel
+DEFAULT_JOBS = 4
+
+# number of rows fetched per query when dumping a table by its primary key
+PAGE_SIZE = 10000
+
+# number of rows inserted per round-trip when recovering a table
+BATCH_SIZE = 1000
+
+# buffer size of dumped files, rows are never flushed
+# one by one so writes reach the disk in large sequential blocks
+BUFFER_SIZE = 1 << 20
+
+# index record of a long column value, its offset and length in data file
+INDEX_RECORD = struct.Struct("<QI")
+
+# ColumnSpec holds the parts of a desc output row used to dump and recover
+ColumnSpec = collections.namedtuple("ColumnSpec", "field is_long")
+
+# PackedValue refers to a long column value in a mapped data file
+PackedValue = collections.namedtuple("PackedValue", "data offset length")
+
+
+# json_dumps serializes value to utf-8 encoded json
+def json_dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode()
+
+
+# json_loads deserializes json from str or bytes
+def json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# to_bytes returns value as bytes in the connection encoding, avoiding a
+# str() round-trip for blobs
+def to_bytes(value, encoding) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        return value
+    if isinstance(value, str):
+        return value.encode(encoding)
+    return str(value).encode(encoding)
+
+
+# map_file memory-maps a file for reading, empty files can not be mapped so
+# an empty bytes is returned for them, both can be used as context manager
+def map_file(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return contextlib.nullcontext(b"")
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# base_type returns type of a column without its width and attributes, for
+# example "int" for "int(10) unsigned"
+def base_type(column_type: str) -> str:
+    return column_type.split("(")[0].split(" ")[0].lower()
+
+
+# column_specs converts desc output rows to list of ColumnSpec
+def column_specs(columns):
+    return [ColumnSpec(column["Field"],
+                       base_type(column["Type"]) in LONG_COLUMN)
+            for column in columns]
+
+
+# quote_identifier quotes a table or column name with backticks
+def quote_identifier(name: str) -> str:
+    return "`{}`".format(name.replace("`", "``"))
+
+
+# output_lock keeps messages of parallel workers from interleaving
+output_lock = threading.Lock()
+
 
 # log shows text message
 def log(message: str):
-    click.echo(message)
+    with output_lock:
+        click.echo(message)
 
 
 # warning shows warning message
 def warning(message: str):
-    click.echo(click.style(message, fg="yellow"))
+    with output_lock:
+        click.echo(click.style(message, fg="yellow"))
 
 
 # error shows error message and exit with error code
 def error(message):
-    click.echo(click.style(message, fg="red"))
+    with output_lock:
+        click.echo(click.style(message, fg="red"))
     exit(1)
 
 
+# log_progress shows every row at verbose level 2, and every PROGRESS_ROWS
+# rows at verbose level 1, so output does not slow down large tables
+def log_progress(table_name, i, verbose):
+    if verbose > VERBOSE_IMPORTANT:
+        log('  -- {}'.format(i))
+    elif verbose > VERBOSE_NONE and i and i % PROGRESS_ROWS == 0:
+        log('  {} rows of "{}" processed...'.format(i, table_name))
+
+
 class ConnectionError(Exception):
     pass
 
 
-# connection creates connection to database
-def connection():
+# connection creates connection to database,
+# local_infile lets the server read client files, so it is only enabled for
+# connections that run LOAD DATA LOCAL INFILE
+def connection(multi_statements=False, local_infile=False):
     try:
         import config
 
@@ -55,15 +171,60 @@ def connection():
     except AttributeError as e:
         raise ConnectionError("Missing config item: {}".format(e))
 
+    client_flag = 0
+    if multi_statements:
+        client_flag |= pymysql.constants.CLIENT.MULTI_STATEMENTS
+
     return pymysql.connect(host=host,
                            port=port,
                            user=user,
                            password=password,
                            db=database,
                            charset=charset,
+                           local_infile=local_infile,
+                           autocommit=False,
+                           client_flag=client_flag,
                            cursorclass=pymysql.cursors.DictCursor)
 
 
+# run_parallel calls func(conn, table) for each table using up to jobs
+# threads, each call borrows a connection from a pool of jobs connections,
+# setup is called once for each new connection
+def run_parallel(tables, func, jobs=DEFAULT_JOBS, setup=None,
+                 local_infile=False):
+    pool = queue.Queue()
+    conns = []
+    try:
+        for _ in range(max(1, min(jobs, len(tables)))):
+            conn = connection(local_infile=local_infile)
+            conns.append(conn)
+            if setup is not None:
+                setup(conn)
+            pool.put(conn)
+
+        def worker(table):
+            conn = pool.get()
+            try:
+                func(conn, table)
+            finally:
+                pool.put(conn)
+
+        with ThreadPoolExecutor(max_workers=len(conns)) as executor:
+            futures = [executor.submit(worker, table) for table in tables]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except Exception:
+                # stop at the first failing table, tables not started yet
+                # are skipped and running ones are waited for
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        for conn in conns:
+            conn.close()
+
+
 # execute executes a statement and commit to database
 def execute(conn, stmt, data=None):
     with conn.cursor() as cursor:
@@ -83,32 +244,75 @@ def get_table_names(conn):
     return tables
 
 
-# get_create_table_stmt returns create table statement of a table
-def get_create_table_stmt(conn, table_name):
+# get_create_table_stmts returns dict of table name to create table statement
+# of each table, statements are sent in one round-trip so conn must be
+# created with multi statements enabled
+def get_create_table_stmts(conn, table_names):
+    stmts = {}
+    if not table_names:
+        return stmts
     with conn.cursor() as cursor:
-        cursor.execute("show create table {}".format(table_name))
-        result = cursor.fetchone()
-    return result["Create Table"]
-
-
-# get_columns returns list of columns in a table
-def get_columns(conn, table_name):
-    columns = []
+        cursor.execute("; ".join(
+            "show create table {}".format(quote_identifier(table_name))
+            for table_name in table_names))
+        for table_name in table_names:
+            stmts[table_name] = cursor.fetchone()["Create Table"]
+            cursor.nextset()
+    return stmts
+
+
+# get_columns returns dict of table name to list of its columns for every
+# table in the database, columns have the same keys as desc output
+def get_columns(conn):
+    columns = {}
     with conn.cursor() as cursor:
-        cursor.execute("desc {}".format(table_name))
+        cursor.execute("SELECT TABLE_NAME, COLUMN_NAME AS `Field`, "
+                       "COLUMN_TYPE AS `Type`, IS_NULLABLE AS `Null`, "
+                       "COLUMN_KEY AS `Key`, COLUMN_DEFAULT AS `Default`, "
+                       "EXTRA AS `Extra` "
+                       "FROM information_schema.COLUMNS "
+                       "WHERE TABLE_SCHEMA = DATABASE() "
+                       "ORDER BY TABLE_NAME, ORDINAL_POSITION")
         for row in cursor.fetchall():
-            columns.append(row)
+            columns.setdefault(row.pop("TABLE_NAME"), []).append(row)
     return columns
 
 
-# get_rows returns list of rows in a table
-def get_rows(conn, table_name):
-    rows = []
-    with conn.cursor() as cursor:
-        cursor.execute("select * from {}".format(table_name))
-        for row in cursor.fetchall():
-            rows.append(row)
-    return rows
+# get_rows yields rows of a table without holding the whole table in memory,
+# tables with an integer primary key are read in pages of PAGE_SIZE rows by
+# keyset pagination, others in one query; rows are always streamed by an
+# unbuffered cursor
+def get_rows(conn, table_name, columns):
+    keys = [column for column in columns if column["Key"] == "PRI"]
+    if len(keys) != 1 or base_type(keys[0]["Type"]) not in INTEGER_COLUMN:
+        with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+            cursor.execute("select * from {}".format(
+                quote_identifier(table_name)))
+            yield from cursor
+        return
+
+    key = keys[0]["Field"]
+    first_page_stmt = "select * from {0} order by {1} limit %s".format(
+        quote_identifier(table_name), quote_identifier(key))
+    next_page_stmt = "select * from {0} where {1} > %s " \
+                     "order by {1} limit %s".format(
+                         quote_identifier(table_name), quote_identifier(key))
+    last = None
+    while True:
+        # rows of a page are streamed too, so a page of long values is
+        # never held in memory
+        with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+            if last is None:
+                cursor.execute(first_page_stmt, (PAGE_SIZE,))
+            else:
+                cursor.execute(next_page_stmt, (last, PAGE_SIZE))
+            count = 0
+            for row in cursor:
+                yield row
+                last = row[key]
+                count += 1
+        if count < PAGE_SIZE:
+            break
 
 
 class RecoverError(Exception):
@@ -117,7 +321,7 @@ class RecoverError(Exception):
 
 def drop_table_if_exists(conn, table_name):
     try:
-        execute(conn, "DROP TABLE {}".format(table_name))
+        execute(conn, "DROP TABLE {}".format(quote_identifier(table_name)))
     except pymysql.err.InternalError as e:
         try:
             # ignore error if table does not exist
@@ -126,49 +330,77 @@ def drop_table_if_exists(conn, table_name):
             raise e
 
 
-def dump_table(conn, table_dir, table_name, verbose=VERBOSE_NONE):
+# open_rows_writer opens the rows file of a table for writing, it is
+# compressed by zstd if compress is True to write less to disk, plain files
+# are faster to recover as they are parsed from a memory map
+def open_rows_writer(table_dir, compress=False):
+    if not compress:
+        return open(os.path.join(table_dir, "rows.txt"), "wb",
+                    buffering=BUFFER_SIZE)
+    raw = open(os.path.join(table_dir, "rows.txt.zst"), "wb",
+               buffering=BUFFER_SIZE)
+    return zstandard.ZstdCompressor(level=3).stream_writer(raw)
+
+
+def dump_table(conn, table_dir, table_name, create_table_stmt, columns,
+               verbose=VERBOSE_NONE, compress=False):
     log('Processing table "{}"...'.format(table_name))
     os.mkdir(table_dir)
-    with open(os.path.join(table_dir, "create_table.sql"), "w") as f:
+    with open(os.path.join(table_dir, "create_table.sql"), "wb",
+              buffering=BUFFER_SIZE) as f:
         if verbose > VERBOSE_NONE:
             log("  Saving create table statement...")
-        f.write(get_create_table_stmt(conn, table_name))
-    with open(os.path.join(table_dir, "desc_table.yaml"), "w") as f:
+        f.write(create_table_stmt.encode())
+    with open(os.path.join(table_dir, "desc_table.json"), "wb",
+              buffering=BUFFER_SIZE) as f:
         if verbose > VERBOSE_NONE:
             log("  Saving desc table output...")
-        columns = get_columns(conn, table_name)
-        f.write(yaml.dump(columns))
-    if verbose > VERBOSE_NONE:
-        log("  Checking columns...")
-    for column in columns:
-        if column["Type"] in LONG_COLUMN:
-            if verbose > VERBOSE_NONE:
-                warning('  Column "{}" is long data.'.format(column["Field"]))
-            os.mkdir(os.path.join(table_dir,
-                                  "column_{}".format(column["Field"])))
-    rows = ""
-    for i, row in enumerate(get_rows(conn, table_name)):
-        if verbose > VERBOSE_IMPORTANT:
-            log('  -- {}'.format(i))
-        elif verbose > VERBOSE_NONE:
-            print('.', end='')
-        text_list = []
-        for column in columns:
-            if column["Type"] in LONG_COLUMN:
-                with open(os.path.join(table_dir,
-                                       "column_{}".format(column["Field"]),
-                                       "{}.txt".format(i)), "w") as conn:
-                    conn.write(str(row[column["Field"]]))
-                text_list.append("_")
-            else:
-                text_list.append(str(row[column["Field"]]))
-        rows += json.dumps(text_list) + "\n"
-    with open(os.path.join(table_dir, "rows.txt"), "w") as f:
-        f.write(rows)
-    print()
+        f.write(json_dumps(columns))
+    with contextlib.ExitStack() as stack:
+        f = stack.enter_context(open_rows_writer(table_dir, compress))
+        # fields holds name of each column and, for a long column, its data
+        # and index files, computed once instead of for every row; values of
+        # a long column are packed into one data file, with an index file
+        # holding offset and length of the value of each row
+        fields = []
+        if verbose > VERBOSE_NONE:
+            log("  Checking columns...")
+        for column in column_specs(columns):
+            packed = None
+            if column.is_long:
+                if verbose > VERBOSE_NONE:
+                    warning('  Column "{}" is long data.'.format(
+                        column.field))
+                path = os.path.join(table_dir,
+                                    "column_{}".format(column.field))
+                packed = (
+                    stack.enter_context(open(path + ".bin", "wb",
+                                             buffering=BUFFER_SIZE)),
+                    stack.enter_context(open(path + ".idx", "wb",
+                                             buffering=BUFFER_SIZE)))
+            fields.append((column.field, packed))
+        for i, row in enumerate(get_rows(conn, table_name, columns)):
+            log_progress(table_name, i, verbose)
+            text_list = []
+            for field, packed in fields:
+                value = row[field]
+                if packed is not None:
+                    value = to_bytes(value, conn.encoding)
+                    data_file, index_file = packed
+                    index_file.write(INDEX_RECORD.pack(data_file.tell(),
+                                                       len(value)))
+                    data_file.write(value)
+                    text_list.append("_")
+                else:
+                    text_list.append(str(value))
+            f.write(json_dumps(text_list))
+            f.write(b"\n")
+
 
+def dump(data_dir, verbose=VERBOSE_NONE, jobs=DEFAULT_JOBS, compress=False):
+    if compress and zstandard is None:
+        error("zstandard is required to compress dumps")
 
-def dump(data_dir, verbose=VERBOSE_NONE):
     if os.path.isdir(data_dir):
         log('"{}" is a directory, removing...'.format(data_dir))
         shutil.rmtree(data_dir)
@@ -179,18 +411,180 @@ def dump(data_dir, verbose=VERBOSE_NONE):
     os.mkdir(data_dir)
 
     try:
-        conn = connection()
+        # metadata of all tables is fetched up front, so workers only
+        # stream rows
+        conn = connection(multi_statements=True)
         try:
-            for table in get_table_names(conn):
-                dump_table(conn, os.path.join(data_dir, table), table,
-                           verbose=verbose)
+            tables = get_table_names(conn)
+            create_table_stmts = get_create_table_stmts(conn, tables)
+            columns = get_columns(conn)
         finally:
             conn.close()
+        run_parallel(tables,
+                     lambda conn, table: dump_table(
+                         conn, os.path.join(data_dir, table), table,
+                         create_table_stmts[table], columns.get(table, []),
+                         verbose=verbose, compress=compress),
+                     jobs=jobs)
         log("Done!")
     except ConnectionError as e:
         error(e)
 
 
+# read_columns returns columns saved in a table directory
+def read_columns(table_dir):
+    with open(os.path.join(table_dir, "desc_table.json"), "rb") as f:
+        return json_loads(f.read())
+
+
+# read_lines yields lines of the rows file of a dumped table, plain files
+# are sliced from a memory map, skipping the copy of a buffered reader
+def read_lines(table_dir):
+    path = os.path.join(table_dir, "rows.txt.zst")
+    if os.path.isfile(path):
+        if zstandard is None:
+            raise RecoverError(
+                "zstandard is required to read \"{}\"".format(path))
+        with open(path, "rb") as raw, io.BufferedReader(
+                zstandard.ZstdDecompressor().stream_reader(raw),
+                BUFFER_SIZE) as f:
+            yield from f
+        return
+    with map_file(os.path.join(table_dir, "rows.txt")) as rows_map:
+        start = 0
+        while start < len(rows_map):
+            end = rows_map.find(b"\n", start)
+            if end == -1:
+                end = len(rows_map)
+            yield rows_map[start:end]
+            start = end + 1
+
+
+# read_index yields (offset, length) records of an index file, reading it in
+# chunks so memory does not grow with the number of rows
+def read_index(f):
+    chunk_size = INDEX_RECORD.size * (BUFFER_SIZE // INDEX_RECORD.size)
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield from INDEX_RECORD.iter_unpack(chunk)
+
+
+# read_rows yields rows of a dumped table, with values of long columns read
+# from their packed data files, or referred by PackedValue if packed is True
+def read_rows(table_dir, table_name, bigDataFlags, verbose=VERBOSE_NONE,
+              packed=False):
+    with contextlib.ExitStack() as stack:
+        # index records are read in row order, so each long column keeps an
+        # iterator over its index file instead of computing record offsets
+        packed_columns = []
+        for i, name in bigDataFlags.items():
+            path = os.path.join(table_dir, name)
+            data_map = stack.enter_context(map_file(path + ".bin"))
+            index_file = stack.enter_context(open(path + ".idx", "rb"))
+            packed_columns.append((i, data_map, read_index(index_file)))
+        for lineNumber, line in enumerate(read_lines(table_dir)):
+            log_progress(table_name, lineNumber, verbose)
+            data = json_loads(line)
+            for i, data_map, index in packed_columns:
+                offset, length = next(index)
+                if packed:
+                    data[i] = PackedValue(data_map, offset, length)
+                else:
+                    data[i] = data_map[offset:offset + length]
+            yield data
+
+
+# insert_rows inserts rows in batches of BATCH_SIZE, one cursor is used for
+# all batches and insert statements are sent as multi-row inserts, all rows
+# are committed in one transaction
+def insert_rows(conn, stmt, rows):
+    try:
+        with conn.cursor() as cursor:
+            batch = []
+            for data in rows:
+                batch.append(data)
+                if len(batch) >= BATCH_SIZE:
+                    cursor.executemany(stmt, batch)
+                    batch = []
+            if batch:
+                cursor.executemany(stmt, batch)
+    except Exception:
+        # roll back inserted batches, a later statement on this connection
+        # such as DROP TABLE would otherwise commit them implicitly
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+# local_infile_enabled returns whether server accepts LOAD DATA LOCAL INFILE
+def local_infile_enabled(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT @@local_infile AS local_infile")
+        return bool(cursor.fetchone()["local_infile"])
+
+
+# escape_field escapes a value for a file loaded by LOAD DATA with default
+# field and line terminators
+def escape_field(value, encoding) -> bytes:
+    if isinstance(value, str):
+        value = value.encode(encoding)
+    return value.replace(b"\\", b"\\\\") \
+        .replace(b"\t", b"\\t") \
+        .replace(b"\n", b"\\n")
+
+
+# write_field writes an escaped value to a file loaded by LOAD DATA, packed
+# values are copied in chunks so a large value is never read in whole
+def write_field(f, value, encoding):
+    if not isinstance(value, PackedValue):
+        f.write(escape_field(value, encoding))
+        return
+    end = value.offset + value.length
+    for start in range(value.offset, end, BUFFER_SIZE):
+        chunk = value.data[start:min(start + BUFFER_SIZE, end)]
+        f.write(escape_field(chunk, encoding))
+
+
+# load_rows writes rows to a temporary tab separated file in the table
+# directory, on the same disk as the dump rather than the system temp dir,
+# and loads it into a table by LOAD DATA LOCAL INFILE, which the server
+# parses in bulk; LOAD DATA LOCAL turns errors into warnings and skips or
+# coerces bad rows, so any warning or missing row rolls back the table and
+# raises RecoverError
+def load_rows(conn, table_dir, table_name, rows):
+    fd, path = tempfile.mkstemp(suffix=".tsv", dir=table_dir)
+    try:
+        count = 0
+        with open(fd, "wb", buffering=BUFFER_SIZE) as f:
+            for data in rows:
+                for i, value in enumerate(data):
+                    if i:
+                        f.write(b"\t")
+                    write_field(f, value, conn.encoding)
+                f.write(b"\n")
+                count += 1
+        with conn.cursor() as cursor:
+            cursor.execute("LOAD DATA LOCAL INFILE %s INTO TABLE {} "
+                           "CHARACTER SET {}".format(
+                               quote_identifier(table_name), conn.charset),
+                           (path,))
+            loaded = cursor.rowcount
+        warnings = conn.show_warnings()
+        if warnings or loaded != count:
+            conn.rollback()
+            message = "Loaded {} of {} rows into table \"{}\"".format(
+                loaded, count, table_name)
+            if warnings:
+                message += ", {} warnings, first: {}".format(
+                    len(warnings), warnings[0][2])
+            raise RecoverError(message)
+        conn.commit()
+    finally:
+        os.remove(path)
+
+
 def recover_table(conn, table_dir, table_name, verbose=VERBOSE_NONE):
     log("Recovering table {}:".format(table_name))
     if not os.path.isdir(table_dir):
@@ -207,52 +601,46 @@ def recover_table(conn, table_dir, table_name, verbose=VERBOSE_NONE):
 
     if verbose > VERBOSE_NONE:
         log("  Recovering data...")
-    with open(os.path.join(table_dir, "desc_table.yaml")) as f:
-        columns = yaml.load(f.read(), yaml.Loader)
+    columns = column_specs(read_columns(table_dir))
     placeholders = []
     bigDataFlags = {}
     if verbose > VERBOSE_NONE:
         log("  Checking columns...")
     for i, column in enumerate(columns):
         placeholders.append("%s")
-        if column["Type"] in LONG_COLUMN:
+        if column.is_long:
             if verbose > VERBOSE_NONE:
-                warning('  Column "{}" is long data.'.format(column["Field"]))
-            bigDataFlags[i] = "column_{}".format(column["Field"])
-    stmt = "INSERT INTO {} VALUE ({})".format(table_name,
+                warning('  Column "{}" is long data.'.format(column.field))
+            bigDataFlags[i] = "column_{}".format(column.field)
+    stmt = "INSERT INTO {} VALUE ({})".format(quote_identifier(table_name),
                                               ", ".join(placeholders))
-    with open(os.path.join(table_dir, "rows.txt")) as f:
-        lineNumber = 0
-        for line in f:
-            if verbose > VERBOSE_IMPORTANT:
-                log('  -- {}'.format(lineNumber))
-            elif verbose > VERBOSE_NONE:
-                print('.', end='')
-            data = json.loads(line)
-            for i, value in enumerate(data):
-                if i in bigDataFlags:
-                    with open(os.path.join(table_dir, bigDataFlags[i],
-                                           "{}.txt".format(lineNumber))) as c:
-                        data[i] = c.read()
-                else:
-                    data[i] = value
-            execute(conn, stmt, data)
-            lineNumber += 1
-        print()
+    # long column values are streamed into the LOAD DATA file from their
+    # packed data files, insert statements need them read in whole
+    if local_infile_enabled(conn):
+        load_rows(conn, table_dir, table_name,
+                  read_rows(table_dir, table_name, bigDataFlags,
+                            verbose=verbose, packed=True))
+    else:
+        insert_rows(conn, stmt,
+                    read_rows(table_dir, table_name, bigDataFlags,
+                              verbose=verbose))
 
 
-def recover(data_dir, verbose=VERBOSE_NONE):
+def recover(data_dir, verbose=VERBOSE_NONE, jobs=DEFAULT_JOBS):
     if not os.path.isdir(data_dir):
         raise RecoverError("\"{}\" is not a directory".format(data_dir))
 
     try:
-        conn = connection()
-        try:
-            for table in os.listdir(data_dir):
-                recover_table(conn, os.path.join(data_dir, table), table,
-                              verbose=verbose)
-        finally:
-            conn.close()
+        # tables are recovered in any order, so foreign keys are not checked
+        # while creating tables and inserting rows
+        run_parallel(os.listdir(data_dir),
+                     lambda conn, table: recover_table(
+                         conn, os.path.join(data_dir, table), table,
+                         verbose=verbose),
+                     jobs=jobs,
+                     setup=lambda conn: execute(
+                         conn, "SET FOREIGN_KEY_CHECKS = 0"),
+                     local_infile=True)
         log("Done!")
     except ConnectionError as e:
         error(e)
@@ -261,12 +649,16 @@ def recover(data_dir, verbose=VERBOSE_NONE):
 @click.command()
 @click.argument('action')
 @click.option('--verbose', default=VERBOSE_NONE, help='Verbose level.')
-def main(verbose, action):
+@click.option('--jobs', default=DEFAULT_JOBS,
+              help='Number of tables processed in parallel.')
+@click.option('--compress/--no-compress', default=False,
+              help='Compress dumped rows with zstd.')
+def main(verbose, jobs, compress, action):
     start_time = time.time()
     if action == "dump":
-        dump("data", verbose=verbose)
+        dump("data", verbose=verbose, jobs=jobs, compress=compress)
     elif action == "recover":
-        recover("data", verbose=verbose)
+        recover("data", verbose=verbose, jobs=jobs)
     else:
         log("No such action.")
     log("--- {} seconds used ---".format(time.time() - start_time))